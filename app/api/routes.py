@@ -7,6 +7,10 @@ from app.dataclasses import Email
 
 router = APIRouter()
 
+# Shared service instance: building the model (and parsing topic_keywords.json)
+# per request is pure overhead, so construct once at import and reuse.
+_inference_service = EmailTopicInferenceService()
+
 class EmailRequest(BaseModel):
     subject: str
     body: str
@@ -38,12 +42,14 @@ class TopicCreateRequest(BaseModel):
 class TopicCreateResponse(BaseModel):
     available_topics: List[str]
 
+# Handlers are plain `def` so FastAPI runs them in its threadpool: the
+# service does synchronous work (feature generation, JSON I/O) that would
+# otherwise block the event loop and serialize concurrent requests.
 @router.post("/emails/classify", response_model=EmailClassificationResponse)
-async def classify_email(request: EmailRequest):
+def classify_email(request: EmailRequest):
     try:
-        inference_service = EmailTopicInferenceService()
         email = Email(subject=request.subject, body=request.body)
-        result = inference_service.classify_email(email, use_store=request.use_store)
+        result = _inference_service.classify_email(email, use_store=request.use_store)
         
         return EmailClassificationResponse(
             predicted_topic=result["predicted_topic"],
@@ -54,13 +60,32 @@ async def classify_email(request: EmailRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/emails/classify/batch", response_model=List[EmailClassificationResponse])
+def classify_email_batch(requests: List[EmailRequest]):
+    """Classify several emails in one request with a single scoring pass"""
+    try:
+        emails = [Email(subject=r.subject, body=r.body) for r in requests]
+        results = _inference_service.classify_batch(
+            emails, use_store=[bool(r.use_store) for r in requests]
+        )
+        return [
+            EmailClassificationResponse(
+                predicted_topic=result["predicted_topic"],
+                topic_scores=result["topic_scores"],
+                features=result["features"],
+                available_topics=result["available_topics"]
+            )
+            for result in results
+        ]
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @router.post("/emails", response_model=EmailAddResponse)
-async def store_email(request: EmailStoreRequest):
+def store_email(request: EmailStoreRequest):
     """Store and email with an optional ground truth topic"""
     try:
-        inference_service = EmailTopicInferenceService()
         email = Email(subject=request.subject, body=request.body)
-        email_id = inference_service.store_email(
+        email_id = _inference_service.store_email(
             email=email,
             ground_truth_topic=request.ground_truth_topic
         )
@@ -71,19 +96,16 @@ async def store_email(request: EmailStoreRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/topics")
-async def topics():
+def topics():
     """Get available email topics"""
-    inference_service = EmailTopicInferenceService()
-    info = inference_service.get_pipeline_info()
+    info = _inference_service.get_pipeline_info()
     return {"topics": info["available_topics"]}
 
 @router.post("/topics", response_model=TopicCreateResponse)
-async def add_topics(request: TopicCreateRequest):
+def add_topics(request: TopicCreateRequest):
     """Dynamically add new topics"""
     try:
-        inference_service = EmailTopicInferenceService()
-        result = inference_service.add_topic(request.name, request.description)
-        print(result)
+        result = _inference_service.add_topic(request.name, request.description)
         return TopicCreateResponse(
             available_topics=result["available_topics"]
         )
@@ -91,6 +113,5 @@ async def add_topics(request: TopicCreateRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/pipeline/info") 
-async def pipeline_info():
-    inference_service = EmailTopicInferenceService()
-    return inference_service.get_pipeline_info()
+def pipeline_info():
+    return _inference_service.get_pipeline_info()
@@ -1,15 +1,29 @@
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from app.api.routes import router as api_router
 from app.core.config import settings
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
     description="ML Server with Feature Generation Factory",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
 app.include_router(api_router, prefix="/api/v1")
 
+@app.on_event("startup")
+def warmup():
+    """Pay cold-start costs at boot instead of on the first request.
+
+    Importing the routes already built the shared service and loaded the
+    topic data; this additionally parses the email store, builds the
+    nearest-neighbor index, and triggers the optional numba JIT compile.
+    """
+    from app.api.routes import _inference_service
+    _inference_service._read_emails()
+    _inference_service._predict_from_store({"email_embeddings_average_embedding": 0.0})
+
 @app.get("/health")
 def health_check():
     return {"status": "healthy", "service": settings.PROJECT_NAME}
@@ -1,47 +1,67 @@
 import os
-import json
 import math
+import orjson
+import numpy as np
 from typing import Dict, Any, List
 
 class EmailClassifierModel:
     """Simple rule-based email classifier model"""
-    
+
+    # Parsed topic data shared across instances; reloaded only when the
+    # file's mtime changes so repeated construction skips the JSON parse.
+    _CACHE: Dict[str, Dict[str, Any]] = None
+    _CACHE_MTIME: float = None
+
     def __init__(self):
         self.topic_data = self._load_topic_data()
         self.topics = list(self.topic_data.keys())
-    
+        self._refresh_topic_arrays()
+
+    def _refresh_topic_arrays(self) -> None:
+        """Precompute derived topic state; only changes when topics do"""
+        self._topic_names = tuple(self.topic_data.keys())
+        self._topic_lengths = np.fromiter(
+            (len(v['description']) for v in self.topic_data.values()),
+            dtype=np.float32
+        )
+        self._topics_with_descs = {
+            topic: data['description'] for topic, data in self.topic_data.items()
+        }
+        self._topic_embs = {
+            topic: float(len(data['description'])) for topic, data in self.topic_data.items()
+        }
+
     def _load_topic_data(self) -> Dict[str, Dict[str, Any]]:
-        """Load topic data from data/topic_keywords.json"""
+        """Load topic data from data/topic_keywords.json, cached by mtime"""
         data_file = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'data', 'topic_keywords.json')
-        with open(data_file, 'r') as f:
-            return json.load(f)
+        mtime = os.stat(data_file).st_mtime
+        cls = EmailClassifierModel
+        if cls._CACHE is None or mtime != cls._CACHE_MTIME:
+            with open(data_file, 'rb') as f:
+                cls._CACHE = orjson.loads(f.read())
+            cls._CACHE_MTIME = mtime
+        return cls._CACHE
     
     def _save_topic_data(self, data: Dict[str, Any]) -> None:
         """Save topic data atomically to avoid corruption"""
-        try:
-            data_file = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'data', 'topic_keywords.json')
-            with open(data_file, 'r+') as file:
-                file_data = json.load(file)
-                file_data.update(data)
-                file.seek(0)
-                json.dump(file_data, file, indent=2)
-                file.truncate()
-        except FileNotFoundError:
-            print(f"Error: The file '{data_file}' was not found.")
-        
-        except json.JSONDecodeError:
-            print(f"Error: The file '{data_file}' is not a valid JSON file.")
+        data_file = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'data', 'topic_keywords.json')
+        # Write to a temp file and rename: no re-read of data we already
+        # hold in memory, and a crash mid-write can't corrupt the file.
+        tmp_file = data_file + '.tmp'
+        with open(tmp_file, 'wb') as f:
+            f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2))
+        os.replace(tmp_file, data_file)
     
+    def _score_all_topics(self, features: Dict[str, Any]) -> np.ndarray:
+        """Score every topic in one vectorized pass"""
+        email_embedding = features.get("email_embeddings_average_embedding", 0.0)
+        # e^(-distance/scale) gives values between 0 and 1 - normalized range
+        return np.exp(-np.abs(np.float32(email_embedding) - self._topic_lengths) / np.float32(50.0))
+
     def predict(self, features: Dict[str, Any]) -> str:
         """Classify email into one of the topics using feature similarity"""
-        scores = {}
-        
-        # Calculate similarity scores for each topic based on features
-        for topic in self.topics:
-            score = self._calculate_topic_score(features, topic)
-            scores[topic] = score
-        
-        return max(scores, key=scores.get)
+        scores = self._score_all_topics(features)
+        return self._topic_names[int(np.argmax(scores))]
     
     def add_topic(self, topic_name: str, description: str) -> Dict[str, Any]:
         """Add a new topic to the JSON file and refresh memory"""
@@ -53,39 +73,48 @@ class EmailClassifierModel:
         self.topic_data[name] = {"description": description}
         self._save_topic_data(self.topic_data)
 
-        # Refresh in-memory lists
+        # Refresh in-memory lists and keep the shared cache coherent
         self.topics = list(self.topic_data.keys())
+        self._refresh_topic_arrays()
+        data_file = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'data', 'topic_keywords.json')
+        EmailClassifierModel._CACHE = self.topic_data
+        EmailClassifierModel._CACHE_MTIME = os.stat(data_file).st_mtime
 
         return {"available_topics": self.topics}
     
     def get_topic_scores(self, features: Dict[str, Any]) -> Dict[str, float]:
         """Get classification scores for all topics"""
-        scores = {}
-        
-        for topic in self.topics:
-            score = self._calculate_topic_score(features, topic)
-            scores[topic] = float(score)
-        
-        return scores
+        scores = self._score_all_topics(features)
+        return dict(zip(self._topic_names, scores.tolist()))
+
+    def predict_with_scores(self, features: Dict[str, Any]) -> tuple:
+        """Predict the best topic and return the per-topic scores in one pass"""
+        scores = self._score_all_topics(features)
+        predicted = self._topic_names[int(np.argmax(scores))]
+        return predicted, dict(zip(self._topic_names, scores.tolist()))
+
+    def predict_with_scores_batch(self, features_list: List[Dict[str, Any]]) -> List[tuple]:
+        """Predict topics for a batch of feature dicts in one scoring pass"""
+        embs = np.fromiter(
+            (f.get("email_embeddings_average_embedding", 0.0) for f in features_list),
+            dtype=np.float32, count=len(features_list)
+        )
+        # (batch, topics) similarity matrix computed with a single ufunc call
+        scores = np.exp(-np.abs(embs[:, None] - self._topic_lengths[None, :]) / np.float32(50.0))
+        winners = np.argmax(scores, axis=1)
+        return [
+            (self._topic_names[int(w)], dict(zip(self._topic_names, row.tolist())))
+            for w, row in zip(winners, scores)
+        ]
     
     def _calculate_topic_score(self, features: Dict[str, Any], topic: str) -> float:
         """Calculate similarity score based on length difference"""
         # Get email embedding from features
         email_embedding = features.get("email_embeddings_average_embedding", 0.0)
-        
-        # Get topic description and create embedding
-        topic_description = self.topic_data[topic]['description']
-        topic_embedding = float(len(topic_description))
-        
-        # Calculate similarity based on inverse distance
-        # Smaller distance = higher similarity
-        distance = abs(email_embedding - topic_embedding)
-        
+
+        # Similarity based on inverse distance to the pre-bound topic embedding;
         # e^(-distance/scale) gives values between 0 and 1 - normalized range
-        scale = 50.0
-        similarity = math.exp(-distance / scale)
-        
-        return similarity
+        return math.exp(-abs(email_embedding - self._topic_embs[topic]) / 50.0)
     
     def get_topic_description(self, topic: str) -> str:
         """Get description for a specific topic"""
@@ -93,4 +122,4 @@ class EmailClassifierModel:
     
     def get_all_topics_with_descriptions(self) -> Dict[str, str]:
         """Get all topics with their descriptions"""
-        return {topic: self.get_topic_description(topic) for topic in self.topics}
\ No newline at end of file
+        return self._topics_with_descs
\ No newline at end of file
@@ -1,34 +1,90 @@
 import os
-import json
+import orjson
+import threading
+import numpy as np
+from collections import OrderedDict
 from fastapi import HTTPException, status
 from typing import Any, Dict, List, Optional
 from app.models.similarity_model import EmailClassifierModel
 from app.features.factory import FeatureGeneratorFactory
 from app.dataclasses import Email
 
+try:
+    import numba
+except ImportError:  # optional accelerator; the NumPy path is used without it
+    numba = None
+
+if numba is not None:
+    @numba.njit(cache=True, fastmath=True)
+    def _argmin_abs(embs, target):
+        """Index of the stored embedding closest to target (JIT-compiled)"""
+        best_i = -1
+        best_d = np.inf
+        for i in range(embs.shape[0]):
+            d = abs(embs[i] - target)
+            if d < best_d:
+                best_d = d
+                best_i = i
+        return best_i
+else:
+    _argmin_abs = None
+
 class EmailTopicInferenceService:
     """Service that orchestrates email topic classification using feature similarity matching"""
-    
+
+    _RESPONSE_CACHE_SIZE = 1024
+
     def __init__(self):
         self.model = EmailClassifierModel()
         self.feature_factory = FeatureGeneratorFactory()
-        self._emails_file = os.path.join(
-            os.path.dirname(os.path.dirname(os.path.dirname(__file__))),
-            'data', 'emails.json'
+        data_dir = os.path.join(
+            os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'data'
         )
+        self._emails_file = os.path.join(data_dir, 'emails.jsonl')
+        self._legacy_emails_file = os.path.join(data_dir, 'emails.json')
+        # Structure-of-arrays sidecar: contiguous embeddings + topic ids,
+        # so the store lookup never parses the full feature blobs.
+        self._store_index_file = os.path.join(data_dir, 'store_index.npz')
+        self._migrate_legacy_store()
+        # Next id to assign; initialized lazily with one scan of the store
+        self._next_id: Optional[int] = None
+        # Sorted embeddings of labeled stored emails (with aligned topics),
+        # rebuilt only when emails.json changes on disk.
+        self._store_embs: np.ndarray = None
+        self._store_topics: List[str] = None
+        self._store_mtime: float = None
+        self._store_size: int = None
+        # Parsed emails.json, reloaded only when the file's mtime changes
+        self._emails_cache: Dict[str, Any] = None
+        self._emails_mtime: float = None
+        # Bounded LRU of classification results keyed by the exact email
+        # text, so repeated inputs skip feature extraction and scoring.
+        self._response_cache: OrderedDict = OrderedDict()
+        # Handlers share this instance across the threadpool; the lock
+        # guards id allocation, index rebuilds, and cache mutation.
+        # Reentrant because _save_email invalidates the response cache.
+        self._lock = threading.RLock()
     
     def add_topic(self, topic_name: str, description: str) -> Dict[str, any]:
         """Append a topic to the topics file."""
-        return self.model.add_topic(topic_name, description)
+        result = self.model.add_topic(topic_name, description)
+        self._invalidate_response_cache()
+        return result
 
     
     def classify_email(self, email: Email, use_store: bool) -> Dict[str, Any]:
         """Classify an email into topics using generated features"""
-        
+
+        cache_key = (email.subject, email.body, bool(use_store))
+        with self._lock:
+            cached = self._response_cache.get(cache_key)
+            if cached is not None:
+                self._response_cache.move_to_end(cache_key)
+                return cached
+
         features = self.feature_factory.generate_all_features(email)
         
-        model_pred = self.model.predict(features)
-        topic_scores = self.model.get_topic_scores(features)
+        model_pred, topic_scores = self.model.predict_with_scores(features)
         
         predicted_topic: str
         if use_store == True:
@@ -37,16 +93,58 @@ class EmailTopicInferenceService:
         else:
             predicted_topic = model_pred
 
-        return {
+        result = {
             "predicted_topic": predicted_topic,
             "topic_scores": topic_scores,
             "features": features,
             "available_topics": self.model.topics,
-            "email": email
         }
+
+        with self._lock:
+            self._response_cache[cache_key] = result
+            if len(self._response_cache) > self._RESPONSE_CACHE_SIZE:
+                self._response_cache.popitem(last=False)
+
+        return result
+
+    def classify_batch(self, emails: List[Email],
+                       use_store: Optional[List[bool]] = None) -> List[Dict[str, Any]]:
+        """Classify several emails with one vectorized scoring pass.
+
+        Feature extraction still runs per email, but the topic scores for
+        the whole batch are computed as a single (batch, topics) matrix,
+        amortizing the per-call overhead of single-item classification.
+        """
+        features_list = [self.feature_factory.generate_all_features(e) for e in emails]
+        scored = self.model.predict_with_scores_batch(features_list)
+
+        results = []
+        for i, (email, features) in enumerate(zip(emails, features_list)):
+            model_pred, topic_scores = scored[i]
+            predicted_topic = model_pred
+            if use_store and use_store[i]:
+                store_topic = self._predict_from_store(features)
+                predicted_topic = store_topic or model_pred  # fallback if none found
+            results.append({
+                "predicted_topic": predicted_topic,
+                "topic_scores": topic_scores,
+                "features": features,
+                "available_topics": self.model.topics,
+            })
+        return results
+
+    def _invalidate_response_cache(self) -> None:
+        """Drop cached classifications; new topics or stored emails change the score space"""
+        with self._lock:
+            self._response_cache.clear()
     
-    def store_email(self, email: Email, ground_truth_topic: Optional[str] = None) -> int:
-        """Store an email with a potential ground truth topic."""
+    def store_email(self, email: Email, ground_truth_topic: Optional[str] = None,
+                    features: Optional[Dict[str, Any]] = None) -> int:
+        """Store an email with a potential ground truth topic.
+
+        Callers that already generated features (e.g. from a prior
+        classification) can pass them in to skip a second extraction pass.
+        """
         # Validate GT if provided
         gt = None
         if ground_truth_topic:
@@ -59,8 +157,9 @@ class EmailTopicInferenceService:
                 )
             gt = mapping[key]
     
-        features = self.feature_factory.generate_all_features(email)
-    
+        if features is None:
+            features = self.feature_factory.generate_all_features(email)
+
         record = {
             "subject": email.subject,
             "body": email.body,
@@ -87,49 +186,146 @@ class EmailTopicInferenceService:
         if feat_val is None:
             return None  # no comparable feature
 
-        data = self._read_emails()
-        emails: List[Dict[str, Any]] = data.get("emails", [])
+        self._refresh_store_index()
+        if self._store_embs is None or len(self._store_embs) == 0:
+            return None
+
+        embs = self._store_embs
+        if _argmin_abs is not None:
+            best = int(_argmin_abs(embs, np.float32(feat_val)))
+            return self._store_topics[best] if best >= 0 else None
+
+        # The score is 1-D absolute distance, so the nearest neighbor sits
+        # next to the insertion point in the sorted embedding array.
+        i = int(np.searchsorted(embs, float(feat_val)))
+        best_i = None
+        best_dist = float("inf")
+        for j in (i - 1, i):
+            if 0 <= j < len(embs):
+                dist = abs(float(embs[j]) - float(feat_val))
+                if dist < best_dist:
+                    best_dist = dist
+                    best_i = j
+
+        return self._store_topics[best_i] if best_i is not None else None
+
+    def _refresh_store_index(self) -> None:
+        """Rebuild the sorted embedding index when emails.jsonl changes on disk"""
+        with self._lock:
+            if os.path.exists(self._emails_file):
+                st = os.stat(self._emails_file)
+                mtime, size = st.st_mtime, st.st_size
+            else:
+                mtime = size = None
+            if (mtime == self._store_mtime and size == self._store_size
+                    and self._store_embs is not None):
+                return
 
-        best_topic: Optional[str] = None
-        best_dist: float = float("inf")
+            # A sidecar built from exactly this version of the store can be
+            # loaded directly, skipping the JSONL parse. Freshness requires
+            # both the recorded source mtime and size to match: an append can
+            # land in the same timestamp granule as the index build, but it
+            # always grows the file.
+            if mtime is not None and os.path.exists(self._store_index_file):
+                with np.load(self._store_index_file, allow_pickle=False) as idx:
+                    if ('source_mtime' in idx.files and float(idx['source_mtime']) == mtime
+                            and 'source_size' in idx.files and int(idx['source_size']) == size):
+                        topic_table = [str(t) for t in idx['topics']]
+                        self._set_store_embs(idx['embeddings'])
+                        self._store_topics = [topic_table[i] for i in idx['topic_ids']]
+                        self._store_mtime = mtime
+                        self._store_size = size
+                        return
 
-        for email in emails:
-            gt = email.get("ground_truth_topic")
-            if not gt:
-                continue  # only use labeled emails
+            embs: List[float] = []
+            topics: List[str] = []
+            for email in self._read_emails().get("emails", []):
+                gt = email.get("ground_truth_topic")
+                if not gt:
+                    continue  # only use labeled emails
+                rec_val = (email.get("features") or {}).get("email_embeddings_average_embedding", None)
+                if rec_val is None:
+                    continue  # skip if stored record has no comparable feature
+                embs.append(float(rec_val))
+                topics.append(gt)
 
-            rec_feats = email.get("features") or {}
-            rec_val = rec_feats.get("email_embeddings_average_embedding", None)
-            if rec_val is None:
-                continue  # skip if stored record has no comparable feature
+            order = np.argsort(embs, kind="stable")
+            self._set_store_embs(np.asarray(embs, dtype=np.float16)[order])
+            self._store_topics = [topics[k] for k in order]
+            self._store_mtime = mtime
+            self._store_size = size
+            self._write_store_index()
 
-            dist = abs(float(feat_val) - float(rec_val))
-            if dist < best_dist:
-                best_dist = dist
-                best_topic = gt
+    def _set_store_embs(self, embs: np.ndarray) -> None:
+        """Keep embeddings as float16 to halve bytes moved in the scan.
 
-        return best_topic        
+        The feature is a character-count-scale scalar, so half precision is
+        far below the differences that matter. Numba's CPU JIT can't
+        compile float16, so the array is promoted once when that kernel is
+        in use.
+        """
+        self._store_embs = embs.astype(np.float32) if _argmin_abs is not None else embs
+
+    def _write_store_index(self) -> None:
+        """Persist the embedding index as a compact SoA sidecar"""
+        if self._store_mtime is None:
+            return  # no store on disk yet, nothing to index
+        topic_table = sorted(set(self._store_topics))
+        topic_to_id = {t: i for i, t in enumerate(topic_table)}
+        topic_ids = np.fromiter(
+            (topic_to_id[t] for t in self._store_topics),
+            dtype=np.int32, count=len(self._store_topics)
+        )
+        tmp_file = self._store_index_file + '.tmp'
+        with open(tmp_file, 'wb') as f:
+            np.savez(f, embeddings=self._store_embs.astype(np.float16),
+                     topic_ids=topic_ids, topics=np.array(topic_table),
+                     source_mtime=np.float64(self._store_mtime),
+                     source_size=np.int64(self._store_size))
+        os.replace(tmp_file, self._store_index_file)
+
+    def _migrate_legacy_store(self) -> None:
+        """One-time conversion of the old emails.json document to JSONL"""
+        if os.path.exists(self._emails_file) or not os.path.exists(self._legacy_emails_file):
+            return
+        with open(self._legacy_emails_file, "rb") as f:
+            emails = orjson.loads(f.read()).get("emails", [])
+        with open(self._emails_file, "wb") as f:
+            for email in emails:
+                f.write(orjson.dumps(email) + b"\n")
 
     def _read_emails(self) -> Dict[str, Any]:
         if not os.path.exists(self._emails_file):
             return {"emails": []}
-        with open(self._emails_file, "r", encoding="utf-8") as f:
-            return json.load(f)
-    
+        mtime = os.stat(self._emails_file).st_mtime
+        if self._emails_cache is None or mtime != self._emails_mtime:
+            with open(self._emails_file, "rb") as f:
+                emails = [orjson.loads(line) for line in f if line.strip()]
+            self._emails_cache = {"emails": emails}
+            self._emails_mtime = mtime
+        return self._emails_cache
+
     def _save_email(self, record: Dict[str, Any]) -> int:
-        """Append an email record to emails.json."""
-        if not os.path.exists(self._emails_file):
-            data = {"emails": []}
-        else:
-            with open(self._emails_file, "r", encoding="utf-8") as f:
-                data = json.load(f)
-    
-        emails: List[Dict[str, Any]] = data.get("emails", [])
-        new_id = (max((e.get("id", 0) for e in emails), default=0) + 1)
-        record["id"] = new_id
-        emails.append(record)
-    
-        with open(self._emails_file, "w", encoding="utf-8") as f:
-            json.dump({"emails": emails}, f, indent=2, ensure_ascii=False)
-    
-        return new_id
\ No newline at end of file
+        """Append an email record to emails.jsonl."""
+        with self._lock:
+            emails: List[Dict[str, Any]] = self._read_emails().get("emails", [])
+
+            if self._next_id is None:
+                self._next_id = max((e.get("id", 0) for e in emails), default=0) + 1
+            record["id"] = self._next_id
+            self._next_id += 1
+
+            # Append-only write: O(1) per insertion instead of rewriting the store
+            with open(self._emails_file, "ab") as f:
+                f.write(orjson.dumps(record) + b"\n")
+
+            emails.append(record)
+            self._emails_cache = {"emails": emails}
+            self._emails_mtime = os.stat(self._emails_file).st_mtime
+            # Force an index rebuild: the append may share the store's previous
+            # mtime granule, so the mtime check alone can miss it.
+            self._store_mtime = None
+            self._store_size = None
+            self._invalidate_response_cache()
+
+            return record["id"]
\ No newline at end of file